@@ -0,0 +1,59 @@
+"""Micro-batching scheduler for model inference.
+
+Streamlit serves each user session on its own thread, so concurrent
+Predict clicks would otherwise each run the model on a batch of one.
+The scheduler collects requests that arrive within a short window and
+runs them through the model as a single stacked batch, amortizing the
+per-call dispatch overhead. Mirrors the batching design of TF-Serving.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+class BatchScheduler:
+    """Collects single-image tensors into batches for a predict function."""
+
+    def __init__(self, predict_fn, max_batch=16, timeout=0.02):
+        self._predict_fn = predict_fn
+        self._max_batch = max_batch
+        self._timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, img_array):
+        """Queue a (1, H, W, C) tensor for prediction.
+
+        Returns a Future resolving to that image's row of each array the
+        predict function returns.
+        """
+        future = Future()
+        self._queue.put((img_array, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+
+            # Wait briefly for other pending requests to share the batch
+            while len(items) < self._max_batch:
+                try:
+                    items.append(self._queue.get(timeout=self._timeout))
+                except queue.Empty:
+                    break
+
+            batch = np.concatenate([img_array for img_array, _ in items], axis=0)
+
+            try:
+                outputs = self._predict_fn(batch)
+                if not isinstance(outputs, tuple):
+                    outputs = (outputs,)
+                for i, (_, future) in enumerate(items):
+                    result = tuple(output[i] for output in outputs)
+                    future.set_result(result[0] if len(result) == 1 else result)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
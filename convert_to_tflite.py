@@ -0,0 +1,39 @@
+"""Convert the Keras model to an INT8 TFLite model for faster CPU inference.
+
+Run once offline after training:
+    python convert_to_tflite.py
+
+The app automatically picks up model/model.tflite when it exists.
+"""
+import glob
+
+import tensorflow as tf
+
+from utils import preprocess_image
+
+MODEL_PATH = 'model/model.h5'
+TFLITE_PATH = 'model/model.tflite'
+
+def representative_dataset():
+    """Yield sample inputs so the converter can calibrate INT8 ranges."""
+    image_paths = glob.glob('uploads/*') or ['0.jpg']
+    for path in image_paths[:100]:
+        yield [preprocess_image(path)]
+
+def main():
+    model = tf.keras.models.load_model(MODEL_PATH)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_model = converter.convert()
+
+    with open(TFLITE_PATH, 'wb') as f:
+        f.write(tflite_model)
+
+    print(f"Saved {TFLITE_PATH} ({len(tflite_model)} bytes)")
+
+if __name__ == '__main__':
+    main()
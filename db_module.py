@@ -1,186 +1,178 @@
-import sqlite3
-import os
 import hashlib
 from datetime import datetime
 
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
 class Database:
     def __init__(self, db_path="diabetic_retinopathy.db"):
         self.db_path = db_path
+        # A pooled engine reuses connections (and their compiled
+        # statements) across calls instead of opening sqlite fresh for
+        # every query
+        self.engine = create_engine(
+            f"sqlite:///{db_path}",
+            pool_size=5,
+            pool_pre_ping=True,
+            connect_args={"check_same_thread": False}
+        )
         self._create_tables()
-    
-    def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-    
+
     def _create_tables(self):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                full_name TEXT,
-                created_at TEXT
-            )
-        ''')
-        
-        # Create predictions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                image_path TEXT,
-                prediction_class TEXT,
-                confidence REAL,
-                created_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
+        with self.engine.begin() as conn:
+            # Create users table
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    full_name TEXT,
+                    created_at TEXT
+                )
+            '''))
+
+            # Create predictions table
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS predictions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    image_path TEXT,
+                    thumb_path TEXT,
+                    prediction_class TEXT,
+                    confidence REAL,
+                    created_at TEXT,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            '''))
+
+            # Older databases predate the thumb_path column
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(predictions)"))]
+            if 'thumb_path' not in columns:
+                conn.execute(text("ALTER TABLE predictions ADD COLUMN thumb_path TEXT"))
+
     def create_user(self, username, email, password, full_name=None):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         try:
             # Using SHA-256 for password hashing instead of bcrypt
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             created_at = datetime.utcnow().isoformat()
-            
-            cursor.execute(
-                "INSERT INTO users (username, email, password_hash, full_name, created_at) VALUES (?, ?, ?, ?, ?)",
-                (username, email, password_hash, full_name, created_at)
-            )
-            
-            conn.commit()
-            
+
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO users (username, email, password_hash, full_name, created_at) "
+                        "VALUES (:username, :email, :password_hash, :full_name, :created_at)"
+                    ),
+                    {
+                        "username": username,
+                        "email": email,
+                        "password_hash": password_hash,
+                        "full_name": full_name,
+                        "created_at": created_at
+                    }
+                )
+
             # Get the created user
-            cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-            user_data = cursor.fetchone()
-            
+            with self.engine.connect() as conn:
+                user_data = conn.execute(
+                    text("SELECT * FROM users WHERE username = :username"),
+                    {"username": username}
+                ).mappings().fetchone()
+
             return dict(user_data) if user_data else None
-            
-        except sqlite3.IntegrityError as e:
-            conn.rollback()
+
+        except IntegrityError as e:
             if "UNIQUE constraint failed: users.username" in str(e):
                 raise Exception("Username already exists")
             elif "UNIQUE constraint failed: users.email" in str(e):
                 raise Exception("Email already exists")
             else:
                 raise e
-        finally:
-            conn.close()
-    
+
     def authenticate_user(self, username, password):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         password_hash = hashlib.sha256(password.encode()).hexdigest()
-        
-        cursor.execute(
-            "SELECT * FROM users WHERE username = ? AND password_hash = ?",
-            (username, password_hash)
-        )
-        
-        user_data = cursor.fetchone()
-        conn.close()
-        
+
+        with self.engine.connect() as conn:
+            user_data = conn.execute(
+                text("SELECT * FROM users WHERE username = :username AND password_hash = :password_hash"),
+                {"username": username, "password_hash": password_hash}
+            ).mappings().fetchone()
+
         return dict(user_data) if user_data else None
-    
-    def save_prediction(self, user_id, image_path, prediction_class, confidence):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            created_at = datetime.utcnow().isoformat()
-            
-            cursor.execute(
-                "INSERT INTO predictions (user_id, image_path, prediction_class, confidence, created_at) VALUES (?, ?, ?, ?, ?)",
-                (user_id, image_path, prediction_class, confidence, created_at)
+
+    def save_prediction(self, user_id, image_path, prediction_class, confidence, thumb_path=None):
+        created_at = datetime.utcnow().isoformat()
+
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    "INSERT INTO predictions (user_id, image_path, thumb_path, prediction_class, confidence, created_at) "
+                    "VALUES (:user_id, :image_path, :thumb_path, :prediction_class, :confidence, :created_at)"
+                ),
+                {
+                    "user_id": user_id,
+                    "image_path": image_path,
+                    "thumb_path": thumb_path,
+                    "prediction_class": prediction_class,
+                    "confidence": confidence,
+                    "created_at": created_at
+                }
             )
-            
-            conn.commit()
-            
-            # Get the created prediction
-            prediction_id = cursor.lastrowid
-            cursor.execute("SELECT * FROM predictions WHERE id = ?", (prediction_id,))
-            prediction_data = cursor.fetchone()
-            
-            return dict(prediction_data) if prediction_data else None
-            
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
-    
+            prediction_id = result.lastrowid
+
+        # Get the created prediction
+        with self.engine.connect() as conn:
+            prediction_data = conn.execute(
+                text("SELECT * FROM predictions WHERE id = :id"),
+                {"id": prediction_id}
+            ).mappings().fetchone()
+
+        return dict(prediction_data) if prediction_data else None
+
     def get_user_predictions(self, user_id):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT * FROM predictions WHERE user_id = ? ORDER BY created_at DESC",
-            (user_id,)
-        )
-        
-        predictions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        return predictions
-    
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT * FROM predictions WHERE user_id = :user_id ORDER BY created_at DESC"),
+                {"user_id": user_id}
+            ).mappings().fetchall()
+
+        return [dict(row) for row in rows]
+
     def get_user_by_id(self, user_id):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        
-        user_data = cursor.fetchone()
-        conn.close()
-        
+        with self.engine.connect() as conn:
+            user_data = conn.execute(
+                text("SELECT * FROM users WHERE id = :id"),
+                {"id": user_id}
+            ).mappings().fetchone()
+
         return dict(user_data) if user_data else None
-    
+
     def update_user_profile(self, user_id, full_name=None, email=None):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
+        updates = []
+        params = {"id": user_id}
+
+        if full_name is not None:
+            updates.append("full_name = :full_name")
+            params["full_name"] = full_name
+
+        if email is not None:
+            updates.append("email = :email")
+            params["email"] = email
+
+        if not updates:
+            return self.get_user_by_id(user_id)
+
         try:
-            updates = []
-            params = []
-            
-            if full_name is not None:
-                updates.append("full_name = ?")
-                params.append(full_name)
-            
-            if email is not None:
-                updates.append("email = ?")
-                params.append(email)
-            
-            if not updates:
-                return self.get_user_by_id(user_id)
-            
-            params.append(user_id)
-            
-            cursor.execute(
-                f"UPDATE users SET {', '.join(updates)} WHERE id = ?",
-                tuple(params)
-            )
-            
-            conn.commit()
-            
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(f"UPDATE users SET {', '.join(updates)} WHERE id = :id"),
+                    params
+                )
+
             return self.get_user_by_id(user_id)
-            
-        except sqlite3.IntegrityError as e:
-            conn.rollback()
+
+        except IntegrityError as e:
             if "UNIQUE constraint failed: users.email" in str(e):
                 raise Exception("Email already exists")
             else:
                 raise e
-        finally:
-            conn.close()
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""Export the Keras model to ONNX for faster CPU inference via ONNX Runtime.
+
+Run once offline after training (requires the tf2onnx package):
+    python export_onnx.py
+
+The app automatically picks up model/model.onnx when it exists.
+"""
+import tensorflow as tf
+import tf2onnx
+
+MODEL_PATH = 'model/model.h5'
+ONNX_PATH = 'model/model.onnx'
+
+def main():
+    model = tf.keras.models.load_model(MODEL_PATH)
+    tf2onnx.convert.from_keras(model, opset=17, output_path=ONNX_PATH)
+    print(f"Saved {ONNX_PATH}")
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,213 @@
+import os
+
+# Must be set before tensorflow is first imported; enables oneDNN's
+# AVX-512/VNNI convolution kernels on CPUs that support them
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+
 import streamlit as st
-import tensorflow as tf
 import numpy as np
+import pandas as pd
 from PIL import Image
 import json
-import os
+from batching import BatchScheduler
 from db_module import Database
 from utils import (
     save_uploaded_file,
-    preprocess_image,
+    save_thumbnail,
+    preprocess_bytes,
     plot_prediction_confidence,
     plot_prediction_history,
     format_date,
-    get_class_color
+    get_class_color,
+    image_data_url
 )
 
-# Initialize database
-db = Database()
+# Initialize database; cached so all sessions share one connection pool
+@st.cache_resource
+def get_db():
+    return Database()
 
-# Load model
-model_path = 'model/model.h5'
-model = tf.keras.models.load_model(model_path)
-
-# Load remedies data
-with open('remedies.json', 'r') as file:
-    remedies_data = json.load(file)
+db = get_db()
 
 # Constants
+model_path = 'model/model.h5'
+tflite_model_path = 'model/model.tflite'
+onnx_model_path = 'model/model.onnx'
 image_height = 150
 image_width = 150
 class_names = ['Mild', 'Moderate', 'Severe', 'Proliferative DR']
 
+@st.cache_resource
+def get_model():
+    """Load the model once per process instead of on every rerun."""
+    # TF is imported lazily so auth/history pages that never predict
+    # don't pay its multi-second import and runtime init at cold start
+    import tensorflow as tf
+
+    # 16-bit conv/dense kernels halve activation memory traffic; the
+    # policy keeps variables (and therefore softmax math) in float32
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    model = tf.keras.models.load_model(model_path)
+
+    # Layers deserialized from H5 keep the float32 dtype stored in their
+    # config and ignore the global policy, so rebuild from a config with
+    # per-layer dtypes stripped; fresh layers pick up the policy and the
+    # float32 weights load unchanged
+    config = model.get_config()
+    for layer_config in config['layers']:
+        if layer_config['class_name'] != 'InputLayer':
+            layer_config['config'].pop('dtype', None)
+    mixed_model = model.__class__.from_config(config)
+    mixed_model.set_weights(model.get_weights())
+    model = mixed_model
+
+    assert any(
+        layer.compute_dtype == 'bfloat16' for layer in model.layers
+    ), "mixed_bfloat16 policy did not apply to the rebuilt model"
+    # Warm-up prediction so the first real prediction doesn't pay
+    # kernel initialization cost
+    model.predict(np.zeros((1, image_height, image_width, 3), dtype=np.float32))
+    return model
+
+@st.cache_resource
+def get_infer():
+    """Build compiled forward passes for batched and single-image inference.
+
+    model.predict goes through Keras's batched dispatch loop and callback
+    machinery, which adds tens of ms of overhead per call. A concrete
+    tf.function with a fixed input signature skips all of that and also
+    avoids retracing.
+    """
+    import tensorflow as tf
+
+    model = get_model()
+
+    def _forward(x):
+        # Cast back to float32 so confidence math is exact, and compute
+        # argmax/max in-graph instead of re-reading the probabilities on
+        # the host
+        probs = tf.cast(model(x, training=False), tf.float32)
+        idx = tf.argmax(probs, axis=-1, output_type=tf.int32)
+        conf = tf.reduce_max(probs, axis=-1)
+        return idx, conf, probs
+
+    infer = tf.function(
+        _forward,
+        input_signature=[tf.TensorSpec([None, image_height, image_width, 3], tf.float32)]
+    ).get_concrete_function()
+
+    # Pre-allocated input for the common single-image case: assigning
+    # into a fixed Variable skips the per-call input tensor allocation
+    single_input = tf.Variable(
+        tf.zeros([1, image_height, image_width, 3], tf.float32),
+        trainable=False
+    )
+    infer_single = tf.function(lambda: _forward(single_input)).get_concrete_function()
+
+    return infer, single_input, infer_single
+
+@st.cache_resource
+def get_predictor():
+    """Return a predict(img_array) -> (indices, confidences, probabilities) callable.
+
+    Prefers the ONNX model (produced by export_onnx.py) when it exists:
+    ONNX Runtime fuses Conv+BN+ReLU and uses MLAS SIMD kernels, typically
+    2-5x faster single-image CPU inference than stock TF. Next choice is
+    the INT8 TFLite model (produced by convert_to_tflite.py), whose int8
+    XNNPACK kernels also beat the FP32 Keras graph. Falls back to the
+    compiled Keras forward pass so the app works without either artifact.
+    """
+    if os.path.exists(onnx_model_path):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            ort = None
+
+        if ort is not None:
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            sess_options.intra_op_num_threads = os.cpu_count()
+            session = ort.InferenceSession(
+                onnx_model_path,
+                providers=['CPUExecutionProvider'],
+                sess_options=sess_options
+            )
+            input_name = session.get_inputs()[0].name
+
+            def predict(img_array):
+                probs = session.run(None, {input_name: img_array})[0]
+                return probs.argmax(axis=-1).astype(np.int32), probs.max(axis=-1), probs
+
+            return predict
+
+    # Only the TFLite and Keras backends need TF in the serving process
+    import tensorflow as tf
+
+    if os.path.exists(tflite_model_path):
+        interpreter = tf.lite.Interpreter(tflite_model_path, num_threads=os.cpu_count())
+        interpreter.allocate_tensors()
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        def predict(img_array):
+            if interpreter.get_input_details()[0]['shape'][0] != img_array.shape[0]:
+                interpreter.resize_tensor_input(input_index, img_array.shape)
+                interpreter.allocate_tensors()
+            interpreter.set_tensor(input_index, img_array)
+            interpreter.invoke()
+            probs = interpreter.get_tensor(output_index)
+            return probs.argmax(axis=-1).astype(np.int32), probs.max(axis=-1), probs
+
+        return predict
+
+    infer, single_input, infer_single = get_infer()
+
+    def predict(img_array):
+        if img_array.shape[0] == 1:
+            single_input.assign(img_array)
+            idx, conf, probs = infer_single()
+        else:
+            idx, conf, probs = infer(tf.constant(img_array))
+        return idx.numpy(), conf.numpy(), probs.numpy()
+
+    return predict
+
+@st.cache_resource
+def get_scheduler():
+    """Share one micro-batching scheduler across all sessions.
+
+    Concurrent predictions land in the same batch instead of each running
+    the model on a batch of one.
+    """
+    return BatchScheduler(get_predictor())
+
+@st.cache_data(ttl=60)
+def get_history_df(user_id, version):
+    """Fetch the user's prediction history as a cached DataFrame.
+
+    version is bumped whenever a new prediction is saved, so the cached
+    frame is invalidated immediately instead of waiting out the TTL.
+    """
+    return pd.DataFrame(db.get_user_predictions(user_id))
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_user(user_id):
+    """Fetch a user row with a short cache to absorb form-driven reruns."""
+    return db.get_user_by_id(user_id)
+
+@st.cache_data
+def get_remedies():
+    """Load remedies data once instead of re-parsing on every rerun."""
+    with open('remedies.json', 'r') as file:
+        return json.load(file)
+
 # Session state initialization
 if 'user' not in st.session_state:
     st.session_state.user = None
 if 'page' not in st.session_state:
     st.session_state.page = 'login'  # Default to login page
+if 'history_version' not in st.session_state:
+    st.session_state.history_version = 0
 
 def login_form():
     with st.form("login_form"):
@@ -103,6 +276,9 @@ def home_page():
     st.header("Upload Retinal Image")
     uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
     
+    scheduler = get_scheduler()
+    remedies_data = get_remedies()
+
     if uploaded_file is not None:
         # Display the uploaded image
         image_display = Image.open(uploaded_file)
@@ -110,24 +286,30 @@ def home_page():
         
         if st.button("Predict"):
             with st.spinner("Analyzing image..."):
-                # Save and preprocess image
-                image_path = save_uploaded_file(uploaded_file)
-                img_array = preprocess_image(image_path)
-                
-                # Make prediction
-                prediction = model.predict(img_array)
-                predicted_class_index = np.argmax(prediction)
-                predicted_class = class_names[predicted_class_index]
-                confidence = float(prediction[0][predicted_class_index])
+                # Preprocess directly from the upload buffer
+                img_array = preprocess_bytes(uploaded_file)
+
+                # Make prediction; argmax and confidence come back
+                # already computed by the predictor
+                idx, conf, probs = scheduler.submit(img_array).result()
+                predicted_class = class_names[int(idx)]
+                confidence = float(conf)
+                prediction = probs[None]
                 
+                # Persist the upload only now that it has a prediction
+                image_path = save_uploaded_file(uploaded_file)
+                thumb_path = save_thumbnail(image_path)
+
                 # Save prediction to database
                 db.save_prediction(
                     st.session_state.user['id'],
                     image_path,
                     predicted_class,
-                    confidence
+                    confidence,
+                    thumb_path
                 )
-                
+                st.session_state.history_version += 1
+
                 # Display results
                 st.subheader("Prediction Results")
                 col1, col2 = st.columns(2)
@@ -154,35 +336,44 @@ def history_page():
     st.title("Prediction History")
     
     # Get user's predictions
-    predictions = db.get_user_predictions(st.session_state.user['id'])
-    
-    if not predictions:
+    history_df = get_history_df(st.session_state.user['id'], st.session_state.history_version)
+
+    if history_df.empty:
         st.info("No prediction history available.")
         return
-    
-    # Display prediction history
-    for pred in predictions:
-        with st.expander(f"Prediction on {format_date(pred['created_at'])}"):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.image(pred['image_path'], width=200)
-            
-            with col2:
-                st.markdown(f"**Class:** {pred['prediction_class']}")
-                st.markdown(f"**Confidence:** {pred['confidence']:.2%}")
-                st.markdown(f"**Date:** {format_date(pred['created_at'])}")
-    
+
+    # Display prediction history as one table instead of per-row
+    # expanders, whose widget count grows with history length
+    display_df = history_df.assign(
+        date=history_df['created_at'].map(format_date),
+        confidence=history_df['confidence'].map('{:.2%}'.format),
+        # Older rows predate thumbnails; ImageColumn only renders URLs,
+        # so inline each image as a data URL
+        image=history_df['thumb_path'].fillna(history_df['image_path']).map(image_data_url)
+    )[['date', 'prediction_class', 'confidence', 'image']]
+
+    st.dataframe(
+        display_df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'date': st.column_config.TextColumn("Date"),
+            'prediction_class': st.column_config.TextColumn("Class"),
+            'confidence': st.column_config.TextColumn("Confidence"),
+            'image': st.column_config.ImageColumn("Image")
+        }
+    )
+
     # Plot prediction history
     st.subheader("Prediction Trend")
-    fig = plot_prediction_history(predictions)
+    fig = plot_prediction_history(history_df, class_names)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
 
 def profile_page():
     st.title("User Profile")
     
-    user = db.get_user_by_id(st.session_state.user['id'])
+    user = get_user(st.session_state.user['id'])
     
     with st.form("profile_form"):
         st.markdown(f"**Username:** {user['username']}")
@@ -193,6 +384,7 @@ def profile_page():
         if submit:
             try:
                 db.update_user_profile(user['id'], full_name, email)
+                get_user.clear()
                 st.success("Profile updated successfully!")
             except Exception as e:
                 st.error(f"Error updating profile: {str(e)}")
@@ -212,19 +404,19 @@ def main():
                 st.image("assets/logo.png", width=200)
             
             st.title("Navigation")
-            
-            if st.button("Home"):
-                st.session_state.page = 'home'
-                st.experimental_rerun()
-            
-            if st.button("History"):
-                st.session_state.page = 'history'
-                st.experimental_rerun()
-            
-            if st.button("Profile"):
-                st.session_state.page = 'profile'
-                st.experimental_rerun()
-            
+
+            # A single radio only reruns when the selection changes,
+            # unlike per-page buttons that each forced an explicit rerun
+            pages = {'Home': 'home', 'History': 'history', 'Profile': 'profile'}
+            labels = list(pages)
+            current = st.session_state.page
+            selection = st.radio(
+                "Navigate",
+                labels,
+                index=next((i for i, label in enumerate(labels) if pages[label] == current), 0)
+            )
+            st.session_state.page = pages[selection]
+
             if st.button("Logout"):
                 st.session_state.user = None
                 st.session_state.page = 'login'
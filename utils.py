@@ -1,17 +1,34 @@
+import base64
+import io
 import os
 import uuid
 import numpy as np
-import tensorflow as tf
+import pandas as pd
+import streamlit as st
 from PIL import Image
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
+
+# Numba is optional; preprocessing falls back to plain NumPy without it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Constants
 UPLOAD_FOLDER = 'uploads'
 IMAGE_SIZE = (150, 150)  # Must match the model's expected input size
 
+if njit is not None:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _normalize_uint8(img_uint8):
+        """Scale uint8 pixels to [0, 1] float32 with a compiled SIMD loop."""
+        out = np.empty(img_uint8.shape, dtype=np.float32)
+        for i in prange(img_uint8.shape[0]):
+            for j in range(img_uint8.shape[1]):
+                for c in range(img_uint8.shape[2]):
+                    out[i, j, c] = img_uint8[i, j, c] * (1.0 / 255.0)
+        return out
+
 def save_uploaded_file(uploaded_file):
     """Save the uploaded file to the uploads folder with a unique filename."""
     # Create uploads directory if it doesn't exist
@@ -29,28 +46,65 @@ def save_uploaded_file(uploaded_file):
     
     return file_path
 
+def save_thumbnail(image_path, size=(256, 256)):
+    """Save a small JPEG thumbnail next to the uploaded image.
+
+    The history page renders these instead of the full-resolution
+    originals, cutting the bytes read and decode work per rerun.
+    """
+    thumb_path = f"{os.path.splitext(image_path)[0]}_thumb.jpg"
+
+    img = Image.open(image_path).convert('RGB')
+    img.thumbnail(size)
+    img.save(thumb_path, 'JPEG', quality=80)
+
+    return thumb_path
+
+def image_data_url(image_path):
+    """Encode an image file as a base64 data URL.
+
+    Streamlit's ImageColumn renders cell values as URLs fetched by the
+    browser, which cannot reach local file paths, so table images are
+    inlined. Intended for the small thumbnails from save_thumbnail.
+    """
+    try:
+        with open(image_path, 'rb') as f:
+            encoded = base64.b64encode(f.read()).decode('ascii')
+    except OSError:
+        return None
+
+    mime = 'image/png' if image_path.lower().endswith('.png') else 'image/jpeg'
+    return f"data:{mime};base64,{encoded}"
+
 def preprocess_image(image_path):
-    """Preprocess the image for model prediction."""
-    # Load and resize image
-    img = Image.open(image_path)
-    img = img.resize(IMAGE_SIZE)
-    img_array = np.array(img)
-    
-    # Convert to RGB if image is grayscale
-    if len(img_array.shape) == 2:
-        img_array = np.stack((img_array,) * 3, axis=-1)
-    
-    # Handle RGBA images (e.g., PNGs with transparency)
-    if img_array.shape[2] == 4:
-        img_array = img_array[:, :, :3]
-    
-    # Normalize pixel values
-    img_array = img_array.astype(np.float32) / 255.0
-    
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
-    
-    return img_array
+    """Preprocess an image file for model prediction."""
+    return _preprocess(Image.open(image_path))
+
+def preprocess_bytes(file_like):
+    """Preprocess an in-memory upload without a disk round-trip.
+
+    Decodes the uploaded bytes directly instead of saving the file and
+    reading it back, which saves two filesystem passes per prediction.
+    """
+    return _preprocess(Image.open(io.BytesIO(file_like.getvalue())))
+
+def _preprocess(img):
+    """Convert a PIL image to the model's batched float32 input tensor.
+
+    Pillow's convert('RGB') handles grayscale and RGBA inputs in C, and
+    the in-place multiply normalizes without an extra array allocation.
+    """
+    img = img.convert('RGB').resize(IMAGE_SIZE, Image.BILINEAR)
+
+    if njit is not None:
+        img_array = _normalize_uint8(np.asarray(img))
+    else:
+        img_array = np.asarray(img, dtype=np.float32)
+        img_array *= np.float32(1 / 255.0)
+
+    # Add batch dimension; guarantee a C-contiguous float32 buffer so TF
+    # ingests it without an internal cast or copy
+    return np.ascontiguousarray(img_array[None, ...], dtype=np.float32)
 
 def get_class_color(class_name):
     """Get color for class visualization."""
@@ -62,8 +116,17 @@ def get_class_color(class_name):
     }
     return colors.get(class_name, '#3498db')  # Default blue
 
+@st.cache_data(hash_funcs={np.ndarray: lambda a: a.tobytes()})
 def plot_prediction_confidence(prediction, class_names):
-    """Create a bar chart of prediction confidence levels."""
+    """Create a bar chart of prediction confidence levels.
+
+    Cached so reruns skip both figure construction and Streamlit's
+    figure-to-JSON serialization when the prediction hasn't changed; the
+    tobytes hash of the 4-float prediction array is exact and tiny.
+    """
+    # Plotly is imported lazily so pages without charts don't pay for it
+    import plotly.graph_objects as go
+
     confidences = prediction[0]
     
     # Create figure
@@ -93,26 +156,43 @@ def plot_prediction_confidence(prediction, class_names):
     
     return fig
 
-def plot_prediction_history(predictions, class_names):
-    """Create a line chart showing prediction history over time."""
-    # Sort predictions by timestamp (oldest first)
-    sorted_preds = sorted(predictions, key=lambda x: x['timestamp'])
-    
-    # Extract dates and classes
-    dates = [datetime.fromisoformat(pred['timestamp']) for pred in sorted_preds]
-    classes = [pred['predicted_class'] for pred in sorted_preds]
-    
+@st.cache_data
+def plot_prediction_history(history_df, class_names):
+    """Create a line chart showing prediction history over time.
+
+    Cached on the history DataFrame contents, so reruns reuse the built
+    figure until a new prediction is saved.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # Accept the legacy list-of-dicts rows from main1.py/db_module_1
+    # alongside the cached DataFrame main.py passes
+    if not isinstance(history_df, pd.DataFrame):
+        history_df = pd.DataFrame(history_df)
+    if 'created_at' not in history_df.columns:
+        history_df = history_df.rename(
+            columns={'timestamp': 'created_at', 'predicted_class': 'prediction_class'}
+        )
+
+    # Sort predictions by date (oldest first)
+    history_df = history_df.sort_values('created_at')
+
+    # Extract dates and classes with vectorized column operations
+    dates = pd.to_datetime(history_df['created_at'])
+    classes = history_df['prediction_class']
+
     # Create figure
     fig = make_subplots(specs=[[{"secondary_y": True}]])
-    
+
     # Add line chart for severity over time
     severity_levels = {class_name: i for i, class_name in enumerate(class_names)}
-    severity_y = [severity_levels[cls] for cls in classes]
-    
+    severity_y = classes.map(severity_levels)
+
     # Create mapping for y-axis ticks
     severity_y_ticks = list(range(len(class_names)))
     severity_y_ticktext = class_names
-    
+
     # Add the line
     fig.add_trace(
         go.Scatter(
@@ -123,7 +203,7 @@ def plot_prediction_history(predictions, class_names):
             line=dict(color='#3498db', width=3),
             marker=dict(
                 size=10,
-                color=[get_class_color(cls) for cls in classes],
+                color=classes.map(get_class_color),
                 line=dict(color='white', width=2)
             )
         )